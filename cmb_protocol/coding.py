@@ -26,10 +26,24 @@ class Decoder:
     def __init__(self, data_length, symbol_size):
         self.minimum_packet_count = math.ceil(data_length / symbol_size)
         self._data_length = data_length
-        self._dec = SourceBlockDecoder(0, symbol_size, data_length)
+        self._symbol_size = symbol_size
+        self._dec = None  # created on the first decoding attempt, not needed if the opposite connection is faster
+        self._packets_received = 0
+        self._pending_packets = []
+
+    def decode_packet(self, packet):
+        self._packets_received += 1
+        self._pending_packets.append(packet)
+        # decoding can't succeed with fewer packets than source symbols, hence buffer them until then
+        if self._packets_received < self.minimum_packet_count:
+            return None
+
+        if self._dec is None:
+            self._dec = SourceBlockDecoder(0, self._symbol_size, self._data_length)
 
-    def decode(self, packets):
-        result = self._dec.decode(packets)
+        # the native decoder copies the packets, hence the list can be reused afterwards
+        result = self._dec.decode(self._pending_packets)
+        self._pending_packets.clear()
         if result is None:
             return None
         return result[:self._data_length]
@@ -1,14 +1,14 @@
+import logging
 from abc import ABC
-from collections import namedtuple
+from bisect import bisect_left, bisect_right, insort
 from heapq import heappush, heappop
 
 import trio
-from recordclass import recordclass
 
 from cmb_protocol import log_util
 from cmb_protocol.coding import Decoder, RAPTORQ_HEADER_SIZE
 from cmb_protocol.constants import MAXIMUM_TRANSMISSION_UNIT, calculate_number_of_blocks, calculate_block_size, \
-    HEARTBEAT_INTERVAL, SCHEDULING_GRANULARITY
+    HEARTBEAT_INTERVAL
 from cmb_protocol.helpers import is_reversed, directed_range, format_resource_id
 from cmb_protocol.log_util import get_logging_context
 from cmb_protocol.packets import RequestResource, AckBlock, NackBlock, ShrinkRange, Data, Error, ErrorCode, Packet
@@ -26,15 +26,20 @@ class Connection(ABC):
     Abstract connection which immediately shuts down after receiving a packet
     """
 
+    __slots__ = '_shutdown', '_spawn', '_send', 'debug_logging'
+
     def __init__(self, shutdown, spawn, send):
         """
         :param shutdown: function for notifying the receiving loop to shut down this connection
         :param spawn:    function for spawning background tasks
-        :param send:     async function for sending a packet to the remote peer
+        :param send:     async function for sending a packet to the remote peer,
+                         must not keep a reference to the packet after returning
         """
         self._shutdown = shutdown
         self._spawn = spawn
         self._send = send
+        # the log level is set up before any connection is created, checking it once keeps per packet logs cheap
+        self.debug_logging = logger.isEnabledFor(logging.DEBUG)
 
     async def handle_packet(self, packet):
         """
@@ -56,10 +61,21 @@ class Connection(ABC):
         await self._send(packet)
 
 
-BlockMetadata = recordclass('BlockMetadata', ['packets_received', 'decoder', 'nack_timestamp'])
+class BlockMetadata:
+    __slots__ = 'packets_received', 'decoder', 'nack_timestamp'
+
+    def __init__(self, packets_received, decoder, nack_timestamp):
+        self.packets_received = packets_received
+        self.decoder = decoder
+        self.nack_timestamp = nack_timestamp
 
 
 class ClientSideConnection(Connection):
+    __slots__ = 'write_block', 'sending_rate', 'inter_packet_arrival_time', 'resource_id', 'reverse', 'direction', \
+                'block_range_start', 'block_range_end', 'acknowledged_blocks', 'block_sizes', \
+                'not_acknowledged_blocks', 'pending_block_ids', 'head_of_line_blocked', \
+                'opposite_head_of_line_blocked', 'rtt', 'cancel_scope', 'packet_handlers'
+
     def __init__(self, shutdown, spawn, send, write_block, resource_id, sending_rate, reverse):
         """
         :param shutdown:     cf. Connection
@@ -73,8 +89,10 @@ class ClientSideConnection(Connection):
         super().__init__(shutdown, spawn, send)
         self.write_block = write_block
         self.sending_rate = sending_rate
+        self.inter_packet_arrival_time = SEGMENT_SIZE / sending_rate  # the sending rate is fixed for the connection
         self.resource_id = resource_id
         self.reverse = reverse
+        self.direction = -1 if reverse else 1
 
         _, resource_length = self.resource_id
         last_block_id = calculate_number_of_blocks(resource_length)  # block id starts at 1
@@ -82,15 +100,27 @@ class ClientSideConnection(Connection):
         self.block_range_start = last_block_id if self.reverse else 1  # inclusive
         self.block_range_end = 0 if self.reverse else last_block_id + 1  # exclusive
 
-        self.acknowledged_blocks = dict()  # block_id -> time of ACK sent
-        self.not_acknowledged_blocks = dict()  # block_id -> (#packets received, decoder, time of NACK sent)
+        # block ids are dense and start at 1, hence per block state is stored in lists indexed by block id
+        self.acknowledged_blocks = [None] * (last_block_id + 1)  # block_id -> time of ACK sent or None
+        # block_id -> size of the block in bytes
+        self.block_sizes = [calculate_block_size(resource_length, block_id) for block_id in range(last_block_id + 1)]
+        # block_id -> (#packets received, decoder, time of NACK sent) or None
+        self.not_acknowledged_blocks = [None] * (last_block_id + 1)
+        self.pending_block_ids = []  # sorted block_ids of not_acknowledged_blocks which are not None
 
-        self.head_of_line_blocked = set()  # block_ids
-        self.opposite_head_of_line_blocked = set()  # block_ids
+        # block_id -> 1 if the block has been decoded but is head of line blocked, else 0
+        # range starts and ends may point one past the last block id in either direction, hence the size
+        self.head_of_line_blocked = bytearray(last_block_id + 2)
+        self.opposite_head_of_line_blocked = bytearray(last_block_id + 2)
 
         self.rtt = None
         self.cancel_scope = None
 
+        self.packet_handlers = {
+            Data: self.handle_data,
+            Error: self.handle_error,
+        }
+
         self.spawn(self.keep_connection_alive)
 
     @property
@@ -104,127 +134,150 @@ class ClientSideConnection(Connection):
     async def keep_connection_alive(self):
         with trio.CancelScope() as cancel_scope:
             self.cancel_scope = cancel_scope
+            # only the timestamp and the block range change between heartbeats, hence the packet is reused
+            resource_request = RequestResource(timestamp=Timestamp.now(),
+                                               sending_rate=self.sending_rate,
+                                               block_range_start=self.block_range_start,
+                                               resource_id=self.resource_id,
+                                               block_range_end=self.block_range_end)
             while True:
-                resource_request = RequestResource(timestamp=Timestamp.now(),
-                                                   sending_rate=self.sending_rate,
-                                                   block_range_start=self.block_range_start,
-                                                   resource_id=self.resource_id,
-                                                   block_range_end=self.block_range_end)
+                resource_request.timestamp = Timestamp.now()
+                resource_request.block_range_start = self.block_range_start
+                resource_request.block_range_end = self.block_range_end
                 await self.send(resource_request)
                 await trio.sleep(HEARTBEAT_INTERVAL)
 
-    async def check_could_decode_previous(self, block_id):
+    async def check_could_decode_previous(self, block_id, now):
         block_metadata = self.not_acknowledged_blocks[block_id]
-        for previous_block_id in directed_range(self.block_range_start, block_id):
-            if previous_block_id not in self.not_acknowledged_blocks:
-                # did decode block already, block is head of line blocked
-                continue
+
+        # only visit blocks which have been received partially, all others have been decoded already or
+        # no packet of them has been received yet
+        if self.reverse:
+            lo = bisect_right(self.pending_block_ids, block_id)
+            hi = bisect_right(self.pending_block_ids, self.block_range_start)
+            previous_block_ids = reversed(self.pending_block_ids[lo:hi])
+        else:
+            lo = bisect_left(self.pending_block_ids, self.block_range_start)
+            hi = bisect_left(self.pending_block_ids, block_id)
+            previous_block_ids = self.pending_block_ids[lo:hi]
+
+        # add inter packet arrival time in case the sender is sending less than 1 packet every 4 RTTs
+        nack_resend_timeout = 4 * self.rtt + self.inter_packet_arrival_time
+
+        for previous_block_id in previous_block_ids:
+            previous_block_metadata = self.not_acknowledged_blocks[previous_block_id]
 
             distance = abs(block_id - previous_block_id)  # if reversed, difference might be negative
             if distance < 2 and block_metadata.packets_received < 3:
                 # does not fulfill packet loss criteria
                 continue
 
-            inter_packet_arrival_time = SEGMENT_SIZE / self.sending_rate
-            # add inter packet arrival time in case the sender is sending less than 1 packet every 4 RTTs
-            nack_resend_timeout = 4 * self.rtt + inter_packet_arrival_time
-            previous_block_metadata = self.not_acknowledged_blocks[previous_block_id]
             if previous_block_metadata.nack_timestamp is not None \
-                    and Timestamp.now() - previous_block_metadata.nack_timestamp < nack_resend_timeout:
+                    and now - previous_block_metadata.nack_timestamp < nack_resend_timeout:
                 # did send nack recently
                 continue
 
-            previous_block_metadata.nack_timestamp = Timestamp.now()
+            previous_block_metadata.nack_timestamp = now
             await self.send(NackBlock(block_id=previous_block_id,
                                       received_packets=previous_block_metadata.packets_received))
-            logger.debug('Sent NACK %d', previous_block_id)
+            if self.debug_logging:
+                logger.debug('Sent NACK %d', previous_block_id)
 
     def advance_head_of_line(self, block_id):
-        if block_id > self.block_range_start if self.reverse else block_id < self.block_range_start:
+        # distance in direction of the range, negative if the block is behind the head of line
+        distance = (block_id - self.block_range_start) * self.direction
+        if distance < 0:
             return False
-        elif block_id == self.block_range_start:
-            self.block_range_start += -1 if self.reverse else 1
-            while self.block_range_start in self.head_of_line_blocked:
-                self.head_of_line_blocked.remove(self.block_range_start)
-                self.block_range_start += -1 if self.reverse else 1
+        elif distance == 0:
+            self.block_range_start += self.direction
+            while self.head_of_line_blocked[self.block_range_start]:
+                self.head_of_line_blocked[self.block_range_start] = 0
+                self.block_range_start += self.direction
 
             # safeguard against overshooting the range end
-            self.block_range_start = \
-                max(self.block_range_start, self.block_range_end) \
-                if self.reverse else \
-                min(self.block_range_start, self.block_range_end)
+            if (self.block_range_end - self.block_range_start) * self.direction < 0:
+                self.block_range_start = self.block_range_end
 
             return True
         else:
-            self.head_of_line_blocked.add(block_id)
+            self.head_of_line_blocked[block_id] = 1
             return False
 
     def advance_opposite_head_of_line(self, block_id):
-        def _last_block_id():
-            return self.block_range_end + 1 if self.reverse else self.block_range_end - 1
-
-        if block_id <= self.block_range_end if self.reverse else block_id >= self.block_range_end:
+        # distance in opposite direction of the range, negative if the block is behind the opposite head of line
+        distance = (self.block_range_end - self.direction - block_id) * self.direction
+        if distance < 0:
             return False
-        elif block_id == _last_block_id():
-            self.block_range_end += 1 if self.reverse else -1
-            while _last_block_id() in self.opposite_head_of_line_blocked:
-                self.opposite_head_of_line_blocked.remove(_last_block_id())
-                self.block_range_end += 1 if self.reverse else -1
+        elif distance == 0:
+            self.block_range_end -= self.direction
+            while self.opposite_head_of_line_blocked[self.block_range_end - self.direction]:
+                self.opposite_head_of_line_blocked[self.block_range_end - self.direction] = 0
+                self.block_range_end -= self.direction
 
             # safeguard against overshooting the range start
-            self.block_range_end = \
-                min(self.block_range_start, self.block_range_end) \
-                if self.reverse else \
-                max(self.block_range_start, self.block_range_end)
+            if (self.block_range_end - self.block_range_start) * self.direction < 0:
+                self.block_range_end = self.block_range_start
 
             return True
         else:
-            self.opposite_head_of_line_blocked.add(block_id)
+            self.opposite_head_of_line_blocked[block_id] = 1
             return False
 
     async def handle_data(self, packet):
-        rtt_sample = Timestamp.now() - packet.timestamp - packet.delay
+        # times which never leave this host are plain clock readings, only timestamps sent over the wire wrap around
+        now = trio.current_time()
+        rtt_sample = Timestamp(now) - packet.timestamp - packet.delay
         self.rtt = rtt_sample if self.rtt is None else 0.9 * self.rtt + 0.1 * rtt_sample
 
-        if packet.block_id in self.active_block_range and packet.block_id not in self.acknowledged_blocks:
-            if packet.block_id not in self.not_acknowledged_blocks:
-                _, resource_length = self.resource_id
-                block_size = calculate_block_size(resource_length, packet.block_id)
-                decoder = Decoder(block_size, MAXIMUM_TRANSMISSION_UNIT)
-                block_metadata = BlockMetadata(packets_received=0, decoder=decoder, nack_timestamp=None)
-                self.not_acknowledged_blocks[packet.block_id] = block_metadata
+        block_id = packet.block_id
+        if block_id >= len(self.acknowledged_blocks):
+            return  # not a block of this resource
+
+        ack_timestamp = self.acknowledged_blocks[block_id]
+        if ack_timestamp is not None:
+            # late or duplicate packet of a decoded block, only check whether the acknowledgement got lost
+            if now - ack_timestamp > 4 * self.rtt:
+                self.acknowledged_blocks[block_id] = now
+                await self.send(AckBlock(block_id=block_id))
+                if self.debug_logging:
+                    logger.debug('Sent duplicate ACK %d', block_id)
+            return
 
-            block_metadata = self.not_acknowledged_blocks[packet.block_id]
-            block_metadata.packets_received += 1
-            if block_metadata.nack_timestamp is not None:
-                # reset nack send timeout
-                block_metadata.nack_timestamp = Timestamp.now()
+        if block_id not in self.active_block_range:
+            return
 
-            decoded_block = block_metadata.decoder.decode([packet.fec_data])
+        block_metadata = self.not_acknowledged_blocks[block_id]
+        if block_metadata is None:
+            decoder = Decoder(self.block_sizes[block_id], MAXIMUM_TRANSMISSION_UNIT)
+            block_metadata = BlockMetadata(packets_received=0, decoder=decoder, nack_timestamp=None)
+            self.not_acknowledged_blocks[block_id] = block_metadata
+            insort(self.pending_block_ids, block_id)
+
+        block_metadata.packets_received += 1
+        if block_metadata.nack_timestamp is not None:
+            # reset nack send timeout
+            block_metadata.nack_timestamp = now
 
-            await self.check_could_decode_previous(packet.block_id)
+        decoded_block = block_metadata.decoder.decode_packet(packet.fec_data)
 
-            if decoded_block:
-                del self.not_acknowledged_blocks[packet.block_id]
+        await self.check_could_decode_previous(block_id, now)
 
-                self.advance_head_of_line(packet.block_id)
-                self.acknowledged_blocks[packet.block_id] = Timestamp.now()
+        if decoded_block:
+            self.not_acknowledged_blocks[block_id] = None
+            del self.pending_block_ids[bisect_left(self.pending_block_ids, block_id)]
 
-                await self.send(AckBlock(block_id=packet.block_id))
-                logger.debug('Sent ACK %d', packet.block_id)
-                await self.write_block(packet.block_id, decoded_block)
+            self.advance_head_of_line(block_id)
+            self.acknowledged_blocks[block_id] = now
 
-                if self.block_range_start == self.block_range_end:
-                    self.shutdown()
+            await self.send(AckBlock(block_id=block_id))
+            if self.debug_logging:
+                logger.debug('Sent ACK %d', block_id)
+            await self.write_block(block_id, decoded_block)
 
-        elif packet.block_id in self.acknowledged_blocks \
-                and Timestamp.now() - self.acknowledged_blocks[packet.block_id] > 4 * self.rtt:
-            # acknowledgement got lost
-            self.acknowledged_blocks[packet.block_id] = Timestamp.now()
-            await self.send(AckBlock(block_id=packet.block_id))
-            logger.debug('Sent duplicate ACK %d', packet.block_id)
+            if self.block_range_start == self.block_range_end:
+                self.shutdown()
 
-    def handle_error(self, packet):
+    async def handle_error(self, packet):
         if ErrorCode.RESOURCE_NOT_FOUND == packet.error_code:
             raise ValueError('Resource {} not found on {}'.format(format_resource_id(self.resource_id),
                                                                   get_logging_context('remote_address')))
@@ -234,10 +287,9 @@ class ClientSideConnection(Connection):
         Called by the receiving loop upon packet receipt.
         cf. Connection
         """
-        if isinstance(packet, Data):
-            await self.handle_data(packet)
-        elif isinstance(packet, Error):
-            self.handle_error(packet)
+        handler = self.packet_handlers.get(type(packet))
+        if handler is not None:
+            await handler(packet)
 
     async def send_stop(self, block_id):
         """
@@ -250,10 +302,11 @@ class ClientSideConnection(Connection):
             self.shutdown()
 
 
-PendingNack = namedtuple('PendingNack', ['block_id', 'repair_count'])
-
-
 class ServerSideConnection(Connection):
+    __slots__ = 'resource_id', 'encoders', 'repair_packet_generators', 'acknowledged_blocks', 'connected', \
+                'block_range_start', 'block_range_end', 'inter_packet_interval', \
+                'recent_receiver_timestamp', 'keep_alive_received_at', 'nack_heap', 'pending_nacks', 'packet_handlers'
+
     def __init__(self, shutdown, spawn, send, resource_id, encoders):
         """
         :param shutdown:     cf. Connection
@@ -266,18 +319,26 @@ class ServerSideConnection(Connection):
         self.resource_id = resource_id
         self.encoders = encoders
         self.repair_packet_generators = dict()  # block_id -> repair packet iterator
-        self.acknowledged_blocks = set()
+        # block ids are dense and start at 1, block_id -> 1 if the block has been acknowledged, else 0
+        self.acknowledged_blocks = bytearray(len(encoders) + 1)
         self.connected = False
 
         self.block_range_start = None
         self.block_range_end = None
-        self.sending_rate = None
+        self.inter_packet_interval = None  # seconds between two packets at the current sending rate
         self.recent_receiver_timestamp = None
 
         self.keep_alive_received_at = None
 
-        self.nack_heap = []  # defines nack processing order
-        self.pending_nacks = set()  # block_id
+        self.nack_heap = []  # block_ids, negated if the range is reversed, defines nack processing order
+        self.pending_nacks = dict()  # block_id -> number of repair packets to send
+
+        self.packet_handlers = {
+            RequestResource: self.handle_request_resource,
+            AckBlock: self.handle_ack_block,
+            NackBlock: self.handle_nack_block,
+            ShrinkRange: self.handle_shrink_range,
+        }
 
     @property
     def block_range_reversed(self):
@@ -294,16 +355,37 @@ class ServerSideConnection(Connection):
 
         return block_id, next(self.repair_packet_generators[block_id])
 
+    def create_stop_check(self):
+        """
+        Creates a function which checks whether a stop signal has been received for a block in the meantime,
+        i.e. whether the block has been acknowledged or has been removed from the active block range.
+        The range can only shrink but never change its direction, hence the direction is only checked once.
+        """
+        acknowledged_blocks = self.acknowledged_blocks
+
+        if self.block_range_reversed:
+            def is_stopped(block_id):
+                return acknowledged_blocks[block_id] \
+                       or not self.block_range_end < block_id <= self.block_range_start
+        else:
+            def is_stopped(block_id):
+                return acknowledged_blocks[block_id] \
+                       or not self.block_range_start <= block_id < self.block_range_end
+
+        return is_stopped
+
     def generate_packets(self):
+        is_stopped = self.create_stop_check()
+
         for block_id in self.active_block_range:
             # check in every outer iteration if we have received a stop signal in the meantime
-            if block_id in self.acknowledged_blocks or block_id not in self.active_block_range:
+            if is_stopped(block_id):
                 continue
 
             encoder = self.encoders[block_id]
             for fec_data in encoder.source_packets():
                 # check in every inner iteration if we have received a stop signal in the meantime
-                if block_id in self.acknowledged_blocks or block_id not in self.active_block_range:
+                if is_stopped(block_id):
                     break
 
                 yield block_id, fec_data
@@ -313,66 +395,86 @@ class ServerSideConnection(Connection):
         yield from self.generate_preemptive_repair_packets()
 
     def generate_preemptive_repair_packets(self):
+        is_stopped = self.create_stop_check()
+        # a block can't be resumed once it has been stopped, hence every round only visits the blocks of the last one
+        remaining_block_ids = list(self.active_block_range)
         while True:
-            repair_packets_generated = 0
-            for block_id in self.active_block_range:
+            block_ids, remaining_block_ids = remaining_block_ids, []
+            for block_id in block_ids:
                 # check if we have received a stop signal in the meantime
-                if block_id in self.acknowledged_blocks or block_id not in self.active_block_range:
+                if is_stopped(block_id):
                     continue
 
                 # generate next repair packet
                 yield self.generate_next_repair_packet(block_id)
-                repair_packets_generated += 1
+                remaining_block_ids.append(block_id)
 
-            if repair_packets_generated == 0:
+            if len(remaining_block_ids) == 0:
                 # all blocks have been acknowledged
                 return
             else:
-                logger.debug('Generated %d repair packets', repair_packets_generated)
+                logger.debug('Generated %d repair packets', len(remaining_block_ids))
 
     def generate_repair_packets(self):
-        while True:
-            if len(self.nack_heap) > 0:
-                _, (block_id, repair_count) = heappop(self.nack_heap)
+        is_stopped = self.create_stop_check()
+        while len(self.nack_heap) > 0:
+            block_id = abs(heappop(self.nack_heap))
+            repair_count = self.pending_nacks[block_id]
 
-                for _ in range(repair_count):
-                    # check if we have received a stop signal in the meantime
-                    if block_id in self.acknowledged_blocks or block_id not in self.active_block_range:
-                        break
+            for _ in range(repair_count):
+                # check if we have received a stop signal in the meantime
+                if is_stopped(block_id):
+                    break
 
-                    yield self.generate_next_repair_packet(block_id)
+                yield self.generate_next_repair_packet(block_id)
 
-                self.pending_nacks.remove(block_id)
+            del self.pending_nacks[block_id]
+            if self.debug_logging:
                 logger.debug('Sent repair %d', block_id)
-            else:
-                yield None, None
 
     async def send_blocks(self):
         try:
+            send = self.send
+            now = trio.current_time
+            # the packet is serialized while being sent, hence a single instance can be reused for all packets
+            packet = Data(block_id=0, timestamp=self.recent_receiver_timestamp, delay=0, fec_data=bytes())
             packet_generator = self.generate_packets()
-            repair_packet_generator = self.generate_repair_packets()
-            send_time = Timestamp.now()
+            repair_packet_generator = None  # only exists while there are NACKs to serve
+            send_time = now()
             while True:
-                if Timestamp.now() - self.keep_alive_received_at > 4 * HEARTBEAT_INTERVAL:
+                wakeup_time = now()
+                delay = wakeup_time - self.keep_alive_received_at
+                if delay > 4 * HEARTBEAT_INTERVAL:
                     logger.debug('Connection timed out')
                     return  # connection is broken, shutdown
 
-                if Timestamp.now() < send_time:
-                    await trio.sleep(SCHEDULING_GRANULARITY)
-                else:
-                    try:
-                        block_id, fec_data = next(repair_packet_generator)  # prioritize repair over source packets
-                        if not fec_data:
-                            block_id, fec_data = next(packet_generator)
-                    except StopIteration:
-                        break  # all source packets have been sent
-                    else:
-                        packet = Data(block_id=block_id,
-                                      timestamp=self.recent_receiver_timestamp,
-                                      delay=Timestamp.now() - self.keep_alive_received_at,
-                                      fec_data=fec_data)
-                        await self.send(packet)
-                        send_time += SEGMENT_SIZE / self.sending_rate
+                if wakeup_time < send_time:
+                    await trio.sleep_until(send_time)  # sleep until the next packet is due
+                    continue
+
+                # the clock is read once per wakeup, all packets of a burst share the timestamp and its delay
+                packet.timestamp = self.recent_receiver_timestamp
+                packet.delay = delay
+
+                # send all packets which have become due since the last wakeup in one burst
+                while send_time <= wakeup_time:
+                    fec_data = None
+                    # prioritize repair over source packets
+                    if repair_packet_generator is None and len(self.nack_heap) > 0:
+                        repair_packet_generator = self.generate_repair_packets()
+                    if repair_packet_generator is not None:
+                        block_id, fec_data = next(repair_packet_generator, (None, None))
+                        if fec_data is None:
+                            repair_packet_generator = None  # all pending NACKs have been served
+                    if fec_data is None:
+                        block_id, fec_data = next(packet_generator, (None, None))
+                        if fec_data is None:
+                            return  # all source packets have been sent
+
+                    packet.block_id = block_id
+                    packet.fec_data = fec_data
+                    await send(packet)
+                    send_time += self.inter_packet_interval
         finally:
             self.shutdown()
 
@@ -403,8 +505,8 @@ class ServerSideConnection(Connection):
 
         logger.debug('Received keep alive')
 
-        self.keep_alive_received_at = Timestamp.now()
-        self.sending_rate = packet.sending_rate
+        self.keep_alive_received_at = trio.current_time()
+        self.inter_packet_interval = SEGMENT_SIZE / packet.sending_rate
         self.recent_receiver_timestamp = packet.timestamp
 
         if not self.connected:
@@ -415,18 +517,26 @@ class ServerSideConnection(Connection):
         else:
             self.shrink_range(packet.block_range_start, packet.block_range_end)
 
-    def handle_ack_block(self, packet):
-        self.acknowledged_blocks.add(packet.block_id)
-
-    def handle_nack_block(self, packet):
+    async def handle_ack_block(self, packet):
+        if not 0 < packet.block_id < len(self.acknowledged_blocks):
+            return  # unknown block, ignore
+        self.acknowledged_blocks[packet.block_id] = 1
+        # no more repair packets will be generated for this block
+        self.repair_packet_generators.pop(packet.block_id, None)
+
+    async def handle_nack_block(self, packet):
+        encoder = self.encoders.get(packet.block_id)
+        if encoder is None:
+            return  # unknown block, ignore
         if packet.block_id not in self.pending_nacks:
-            logger.debug('Received NACK %d', packet.block_id)
+            if self.debug_logging:
+                logger.debug('Received NACK %d', packet.block_id)
             priority = -packet.block_id if self.block_range_reversed else packet.block_id
-            repair_count = max(2, self.encoders[packet.block_id].minimum_packet_count - packet.received_packets)
-            heappush(self.nack_heap, (priority, PendingNack(block_id=packet.block_id, repair_count=repair_count)))
-            self.pending_nacks.add(packet.block_id)
+            repair_count = max(2, encoder.minimum_packet_count - packet.received_packets)
+            heappush(self.nack_heap, priority)
+            self.pending_nacks[packet.block_id] = repair_count
 
-    def handle_shrink_range(self, packet):
+    async def handle_shrink_range(self, packet):
         self.shrink_range(packet.block_range_start, packet.block_range_end)
 
     async def handle_packet(self, packet):
@@ -434,11 +544,6 @@ class ServerSideConnection(Connection):
         Called by the receiving loop upon packet receipt.
         cf. Connection
         """
-        if isinstance(packet, RequestResource):
-            await self.handle_request_resource(packet)
-        elif isinstance(packet, AckBlock):
-            self.handle_ack_block(packet)
-        elif isinstance(packet, NackBlock):
-            self.handle_nack_block(packet)
-        elif isinstance(packet, ShrinkRange):
-            self.handle_shrink_range(packet)
+        handler = self.packet_handlers.get(type(packet))
+        if handler is not None:
+            await handler(packet)
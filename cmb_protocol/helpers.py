@@ -1,30 +1,28 @@
 import struct
-from functools import wraps
+from functools import wraps, lru_cache
 from ipaddress import ip_address, IPv6Address
 
-RESOURCE_ID_STRUCT_FORMAT = '!16sQ'
+RESOURCE_ID_STRUCT = struct.Struct('!16sQ')
 
 
 def pack_uint48(uint48):
     assert uint48 < 2**48
-    return struct.pack('!Q', uint48)[-6:]
+    return uint48.to_bytes(6, 'big')
 
 
 def unpack_uint48(buffer):
     assert len(buffer) == 6
-    uint48, = struct.unpack('!Q', bytes(2) + buffer)
-    return uint48
+    return int.from_bytes(buffer, 'big')
 
 
 def pack_uint24(uint24):
     assert uint24 < 2**24
-    return struct.pack('!I', uint24)[-3:]
+    return uint24.to_bytes(3, 'big')
 
 
 def unpack_uint24(buffer):
     assert len(buffer) == 3
-    uint24, = struct.unpack('!I', bytes(1) + buffer)
-    return uint24
+    return int.from_bytes(buffer, 'big')
 
 
 def is_reversed(start, end):
@@ -32,7 +30,8 @@ def is_reversed(start, end):
 
 
 def directed_range(start, end):
-    return reversed(range(end + 1, start + 1)) if is_reversed(start, end) else range(start, end)
+    # a plain range with a negative step, unlike a reversed() iterator it supports constant time membership tests
+    return range(start, end, -1) if is_reversed(start, end) else range(start, end)
 
 
 def once(func):
@@ -48,14 +47,16 @@ def once(func):
     return wrapped
 
 
+@lru_cache(maxsize=256)
 def format_resource_id(resource_id):
-    return struct.pack(RESOURCE_ID_STRUCT_FORMAT, *resource_id).hex()
+    return RESOURCE_ID_STRUCT.pack(*resource_id).hex()
 
 
 def parse_resource_id(hex_string):
-    return struct.unpack(RESOURCE_ID_STRUCT_FORMAT, bytes.fromhex(hex_string))
+    return RESOURCE_ID_STRUCT.unpack(bytes.fromhex(hex_string))
 
 
+@lru_cache(maxsize=256)
 def format_address(address):
     ip_addr, port = address
     try:
@@ -11,11 +11,25 @@ _verbose_logging = False
 
 
 class _AddressInjectingAdapter(LoggerAdapter):
-    def process(self, msg, kwargs):
-        logging_context = {**self.extra, **_logging_context.get()}
-        context_lines = ['{}={}'.format(key, value) for key, value in logging_context.items() if value is not None]
+    def __init__(self, logger, extra):
+        super().__init__(logger, extra)
+        # context dicts are never mutated, hence the formatted lines can be reused while the context is the same
+        self._cached_context = None
+        self._cached_context_lines = []
 
-        if _verbose_logging and len(context_lines) > 0:
+    def process(self, msg, kwargs):
+        if not _verbose_logging:
+            return msg, kwargs  # the context is only appended in verbose mode, don't bother building it
+
+        context = _logging_context.get()
+        if context is not self._cached_context:
+            logging_context = {**self.extra, **context}
+            self._cached_context_lines = ['{}={}'.format(key, value) for key, value in logging_context.items()
+                                          if value is not None]
+            self._cached_context = context
+        context_lines = self._cached_context_lines
+
+        if len(context_lines) > 0:
             return '\n# '.join([msg, *context_lines]) + '\n', kwargs
 
         return msg, kwargs
@@ -44,7 +58,9 @@ def set_remote_address(address):
 
 def update_logging_context(**kwargs):
     curr = _logging_context.get()
-    _logging_context.set({**curr, **kwargs})
+    # keep the current dict if nothing changes, e.g. for consecutive packets from the same address
+    if any(curr.get(key) != value for key, value in kwargs.items()):
+        _logging_context.set({**curr, **kwargs})
 
 
 def get_logging_context(key):
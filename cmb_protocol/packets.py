@@ -8,10 +8,11 @@ from cmb_protocol.timestamp import Timestamp
 
 class _PacketMeta(ABCMeta):
     """
-    Metaclass for reading the _packet_type_ field of packet class definitions.
+    Metaclass for reading the _packet_type_ and _format_ fields of packet class definitions.
     """
 
     _PACKET_TYPE_KEY = '_packet_type_'
+    _FORMAT_KEY = '_format_'
     _PACKET_TYPE_FORMAT = '!H'
     PACKET_TYPE_SIZE = struct.calcsize(_PACKET_TYPE_FORMAT)
 
@@ -23,25 +24,33 @@ class _PacketMeta(ABCMeta):
         else:
             try:
                 cls.packet_type = struct.pack(cls._PACKET_TYPE_FORMAT, dct[cls._PACKET_TYPE_KEY])
-            except (KeyError, struct.error) as e:
-                msg = '{}.{} must have a valid class member {}'.format(cls.__module__, cls.__name__,
-                                                                       cls._PACKET_TYPE_KEY)
+                # compile the format once instead of parsing it on every pack and unpack,
+                # the packet type is prepended to the fields so that a packet is packed in one go
+                fields_format = dct[cls._FORMAT_KEY]
+                assert fields_format.startswith('!')
+                cls._struct = struct.Struct(cls._PACKET_TYPE_FORMAT + fields_format[1:])
+            except (KeyError, AssertionError, struct.error) as e:
+                msg = '{}.{} must have valid class members {} and {}'.format(cls.__module__, cls.__name__,
+                                                                             cls._PACKET_TYPE_KEY, cls._FORMAT_KEY)
                 raise AssertionError(msg) from e
+            cls.HEADER_SIZE = cls._struct.size - cls.PACKET_TYPE_SIZE
 
 
 class Packet(ABC, metaclass=_PacketMeta):
     """
     Abstract base class for all packet definitions.
     _packet_type_ has to be set on the class, e.g. `_packet_type_ = 0xbeef`.
+    _format_ has to be set to the network order struct format of the fields (excluding the packet type),
+    e.g. `_format_ = '!H'`.
     """
 
     def to_bytes(self):
-        return type(self).packet_type + self._serialize_fields()
+        return self._struct.pack(self._packet_type_, *self._serialize_fields())
 
     @classmethod
     def from_bytes(cls, packet_bytes):
         assert cls.extract_packet_type(packet_bytes) == cls.packet_type
-        return cls._parse_fields(packet_bytes[cls.PACKET_TYPE_SIZE:])
+        return cls._parse_fields(packet_bytes)
 
     @classmethod
     def extract_packet_type(cls, packet_bytes):
@@ -50,7 +59,8 @@ class Packet(ABC, metaclass=_PacketMeta):
     @abstractmethod
     def _serialize_fields(self):
         """
-        Abstract method for serializing the fields of a packet to bytes (excluding the packet type).
+        Abstract method for returning the values of the fields of a packet in the order of _format_
+        (excluding the packet type).
         """
         pass
 
@@ -58,7 +68,8 @@ class Packet(ABC, metaclass=_PacketMeta):
     @abstractmethod
     def _parse_fields(cls, packet_bytes):
         """
-        Abstract method for parsing the fields of a packet from bytes (excluding the packet type).
+        Abstract method for parsing the fields of a packet from bytes (including the packet type,
+        which is the first value unpacked by _struct).
         """
         pass
 
@@ -68,7 +79,7 @@ class RequestResource(Packet):
 
     _packet_type_ = 0xcb00
 
-    __format = '!1s3sI6s16sQ6s'
+    _format_ = '!1s3sI6s16sQ6s'
 
     def __init__(self, timestamp, sending_rate, block_range_start, resource_id, block_range_end):
         super().__init__()
@@ -80,18 +91,17 @@ class RequestResource(Packet):
         self.block_range_end = block_range_end
 
     def _serialize_fields(self):
-        values = bytes(1), \
-                 self.timestamp.to_bytes(), \
-                 self.sending_rate, \
-                 pack_uint48(self.block_range_start), \
-                 *self.resource_id, \
-                 pack_uint48(self.block_range_end)
-        return struct.pack(self.__format, *values)
+        return bytes(1), \
+               self.timestamp.to_bytes(), \
+               self.sending_rate, \
+               pack_uint48(self.block_range_start), \
+               *self.resource_id, \
+               pack_uint48(self.block_range_end)
 
     @classmethod
     def _parse_fields(cls, packet_bytes):
-        _, timestamp, sending_rate, block_range_start, resource_hash, resource_length, block_range_end \
-            = struct.unpack(cls.__format, packet_bytes)
+        _, _, timestamp, sending_rate, block_range_start, resource_hash, resource_length, block_range_end \
+            = cls._struct.unpack(packet_bytes)
         return RequestResource(timestamp=Timestamp.from_bytes(timestamp),
                                sending_rate=sending_rate,
                                block_range_start=unpack_uint48(block_range_start),
@@ -104,8 +114,7 @@ class Data(Packet):
 
     _packet_type_ = 0xcb01
 
-    __format = '!6s1s3sH'
-    HEADER_SIZE = struct.calcsize(__format)
+    _format_ = '!6s1s3sH'  # header only, the FEC data is appended
 
     def __init__(self, block_id, timestamp, delay, fec_data):
         super().__init__()
@@ -115,17 +124,21 @@ class Data(Packet):
         self.delay = delay
         self.fec_data = fec_data
 
+    def to_bytes(self):
+        # the payload is much larger than the header, hence it is only copied once
+        return super().to_bytes() + self.fec_data
+
     def _serialize_fields(self):
-        values = pack_uint48(self.block_id), \
-                 bytes(1), \
-                 self.timestamp.to_bytes(), \
-                 int(self.delay * 1000)
-        return struct.pack(self.__format, *values) + self.fec_data
+        return pack_uint48(self.block_id), \
+               bytes(1), \
+               self.timestamp.to_bytes(), \
+               int(self.delay * 1000)
 
     @classmethod
     def _parse_fields(cls, packet_bytes):
-        header, fec_data = packet_bytes[:cls.HEADER_SIZE], packet_bytes[cls.HEADER_SIZE:]
-        block_id, reserved, timestamp, delay = struct.unpack(cls.__format, header)
+        # unpack the header in place, only the payload is copied out of the datagram
+        _, block_id, reserved, timestamp, delay = cls._struct.unpack_from(packet_bytes)
+        fec_data = packet_bytes[cls._struct.size:]
         return Data(block_id=unpack_uint48(block_id),
                     timestamp=Timestamp.from_bytes(timestamp),
                     delay=delay / 1000,
@@ -137,18 +150,18 @@ class AckBlock(Packet):
 
     _packet_type_ = 0xcb02
 
-    __format = '!6s'
+    _format_ = '!6s'
 
     def __init__(self, block_id):
         super().__init__()
         self.block_id = block_id
 
     def _serialize_fields(self):
-        return struct.pack(self.__format, pack_uint48(self.block_id))
+        return pack_uint48(self.block_id),
 
     @classmethod
     def _parse_fields(cls, packet_bytes):
-        block_id, = struct.unpack(cls.__format, packet_bytes)
+        _, block_id = cls._struct.unpack(packet_bytes)
         return AckBlock(block_id=unpack_uint48(block_id))
 
 
@@ -157,7 +170,7 @@ class NackBlock(Packet):
 
     _packet_type_ = 0xcb03
 
-    __format = '!6sH'
+    _format_ = '!6sH'
 
     def __init__(self, block_id, received_packets):
         super().__init__()
@@ -165,11 +178,11 @@ class NackBlock(Packet):
         self.block_id = block_id
 
     def _serialize_fields(self):
-        return struct.pack(self.__format, pack_uint48(self.block_id), self.received_packets)
+        return pack_uint48(self.block_id), self.received_packets
 
     @classmethod
     def _parse_fields(cls, packet_bytes):
-        block_id, received_packets = struct.unpack(cls.__format, packet_bytes)
+        _, block_id, received_packets = cls._struct.unpack(packet_bytes)
         return NackBlock(block_id=unpack_uint48(block_id), received_packets=received_packets)
 
 
@@ -178,7 +191,7 @@ class ShrinkRange(Packet):
 
     _packet_type_ = 0xcb04
 
-    __format = '!6s6s'
+    _format_ = '!6s6s'
 
     def __init__(self, block_range_start, block_range_end):
         super().__init__()
@@ -186,11 +199,11 @@ class ShrinkRange(Packet):
         self.block_range_end = block_range_end
 
     def _serialize_fields(self):
-        return struct.pack(self.__format, pack_uint48(self.block_range_start), pack_uint48(self.block_range_end))
+        return pack_uint48(self.block_range_start), pack_uint48(self.block_range_end)
 
     @classmethod
     def _parse_fields(cls, packet_bytes):
-        block_range_start, block_range_end = struct.unpack(cls.__format, packet_bytes)
+        _, block_range_start, block_range_end = cls._struct.unpack(packet_bytes)
         return ShrinkRange(block_range_start=unpack_uint48(block_range_start),
                            block_range_end=unpack_uint48(block_range_end))
 
@@ -205,7 +218,7 @@ class Error(Packet):
 
     _packet_type_ = 0xcb05
 
-    __format = '!H'
+    _format_ = '!H'
 
     def __init__(self, error_code):
         super().__init__()
@@ -213,11 +226,11 @@ class Error(Packet):
         self.error_code = error_code
 
     def _serialize_fields(self):
-        return struct.pack(self.__format, self.error_code)
+        return self.error_code,
 
     @classmethod
     def _parse_fields(cls, packet_bytes):
-        error_code, = struct.unpack(cls.__format, packet_bytes)
+        _, error_code = cls._struct.unpack(packet_bytes)
         return Error(error_code=ErrorCode(error_code))
 
 
@@ -247,6 +260,10 @@ class PacketType(Enum):
     def parse_packet(cls, packet_bytes):
         try:
             packet_type = Packet.extract_packet_type(packet_bytes)
-            return cls(packet_type).packet_cls.from_bytes(packet_bytes)
+            return _PACKET_CLASSES[packet_type].from_bytes(packet_bytes)
         except Exception as exc:
             raise ValueError('Failed to parse bytes into packet') from exc
+
+
+# packet type -> packet class, a plain dict lookup is cheaper than constructing the enum member for every packet
+_PACKET_CLASSES = {packet_type.value: packet_type.packet_cls for packet_type in PacketType}
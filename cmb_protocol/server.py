@@ -4,7 +4,7 @@ from functools import partial
 from trio import socket
 from cmb_protocol.coding import Encoder
 from cmb_protocol.connection import ServerSideConnection
-from cmb_protocol.constants import MAXIMUM_TRANSMISSION_UNIT, SYMBOLS_PER_BLOCK
+from cmb_protocol.constants import MAXIMUM_TRANSMISSION_UNIT, BLOCK_SIZE
 from cmb_protocol.packets import PacketType, RequestResource
 from cmb_protocol.helpers import once, format_resource_id
 from cmb_protocol.trio_util import spawn_child_nursery, get_ip_family
@@ -81,8 +81,7 @@ def run(file_reader, addresses):
         logger.info('Reading from %s', file_reader.name)
 
         # split file into blocks
-        block_size = MAXIMUM_TRANSMISSION_UNIT * SYMBOLS_PER_BLOCK
-        for block_index, block_content in enumerate(iter(partial(file_reader.read, block_size), b'')):
+        for block_index, block_content in enumerate(iter(partial(file_reader.read, BLOCK_SIZE), b'')):
             md5.update(block_content)
             resource_length += len(block_content)
             encoders[block_index + 1] = Encoder(block_content, MAXIMUM_TRANSMISSION_UNIT)  # block id starts at 1
@@ -1,4 +1,5 @@
-import trio
+import math
+from trio import current_time
 from cmb_protocol.helpers import unpack_uint24, pack_uint24
 
 
@@ -11,27 +12,37 @@ class Timestamp:
     timestamps must not be compared with timestamps created in a different trio context.
     """
 
-    __slots__ = 'value',
+    __slots__ = 'milliseconds',
 
-    MAX_VALUE = 2**24 / 1000
+    MASK = 2**24 - 1  # stored as milliseconds, wrapping around is a bitwise and with the mask
 
     def __init__(self, value):
-        self.value = value % self.MAX_VALUE
+        self.milliseconds = math.floor(value * 1000) & self.MASK
 
-    @staticmethod
-    def now():
-        return Timestamp(trio.current_time())
+    @classmethod
+    def now(cls):
+        return cls(current_time())
 
-    @staticmethod
-    def from_bytes(data):
-        return Timestamp(unpack_uint24(data) / 1000)
+    @classmethod
+    def from_milliseconds(cls, milliseconds):
+        timestamp = cls.__new__(cls)
+        timestamp.milliseconds = milliseconds & cls.MASK
+        return timestamp
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls.from_milliseconds(unpack_uint24(data))
 
     def to_bytes(self):
-        return pack_uint24(int(self.value * 1000))
+        return pack_uint24(self.milliseconds)
+
+    @property
+    def value(self):
+        return self.milliseconds / 1000
 
     def __add__(self, other):
         if isinstance(other, int) or isinstance(other, float):
-            return Timestamp(self.value + other)
+            return Timestamp.from_milliseconds(math.floor(self.milliseconds + other * 1000))
         else:
             return NotImplemented
 
@@ -40,40 +51,14 @@ class Timestamp:
 
     def __sub__(self, other):
         if isinstance(other, int) or isinstance(other, float):
-            return Timestamp(self.value - other)
+            return Timestamp.from_milliseconds(math.floor(self.milliseconds - other * 1000))
         elif isinstance(other, Timestamp):
-            return (self.value - other.value) % self.MAX_VALUE
+            return ((self.milliseconds - other.milliseconds) & self.MASK) / 1000
         else:
             return NotImplemented
 
     def __eq__(self, other):
-        return isinstance(other, Timestamp) and self.value == other.value
-
-    def __lt__(self, other):  # self < other (self older than other)
-        if isinstance(other, Timestamp):
-            # Due to wrap around at approx. 4:40h, there is no way of knowing which timestamp is older.
-            # However, we can assume the order which produces the smallest duration to be correct.
-            # This produces correct results for two timestamps which are apart less than approx. 2:20h.
-            # In our case we won't be comparing timestamps with each other which are apart by more than a few seconds.
-            return self - other > other - self
-        else:
-            return NotImplemented
-
-    def __gt__(self, other):  # self > other (self newer than other)
-        if isinstance(other, Timestamp):
-            # Due to wrap around at approx. 4:40h, there is no way of knowing which timestamp is older.
-            # However, we can assume the order which produces the smallest duration to be correct.
-            # This produces correct results for two timestamps which are apart less than approx. 2:20h.
-            # In our case we won't be comparing timestamps with each other which are apart by more than a few seconds.
-            return self - other < other - self
-        else:
-            return NotImplemented
-
-    def __le__(self, other):
-        return self == other or self < other
-
-    def __ge__(self, other):
-        return self == other or self > other
+        return isinstance(other, Timestamp) and self.milliseconds == other.milliseconds
 
     def __repr__(self):
         return 'Timestamp(value={})'.format(self.value)
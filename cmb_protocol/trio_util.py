@@ -1,6 +1,5 @@
 import math
 import trio
-from ipaddress import ip_address, IPv6Address
 from trio import Event, socket
 from cmb_protocol import log_util
 
@@ -36,5 +35,5 @@ async def _run_nursery_until_event(send_channel, shutdown_trigger, shutdown_time
 
 def get_ip_family(address):
     ip_addr, port = address
-    parsed_ip_addr = ip_address(ip_addr)
-    return socket.AF_INET6 if isinstance(parsed_ip_addr, IPv6Address) else socket.AF_INET
+    # only IPv6 addresses contain colons, no need to fully parse the address
+    return socket.AF_INET6 if ':' in ip_addr else socket.AF_INET
@@ -0,0 +1,41 @@
+import trio
+from cmb_protocol.coding import Encoder
+from cmb_protocol.connection import ServerSideConnection
+from cmb_protocol.constants import MAXIMUM_TRANSMISSION_UNIT
+from cmb_protocol.packets import AckBlock, NackBlock
+
+
+def create_server_side_connection(number_of_blocks):
+    def shutdown():
+        pass
+
+    def spawn(async_fn, *args):
+        pass
+
+    async def send(packet):
+        pass
+
+    encoders = {block_id: Encoder(bytes(MAXIMUM_TRANSMISSION_UNIT), MAXIMUM_TRANSMISSION_UNIT)
+                for block_id in range(1, number_of_blocks + 1)}
+    resource_id = bytes(16), number_of_blocks * MAXIMUM_TRANSMISSION_UNIT
+    return ServerSideConnection(shutdown, spawn, send, resource_id, encoders)
+
+
+def test_ack_block_out_of_range_is_ignored():
+    connection = create_server_side_connection(number_of_blocks=2)
+    trio.run(connection.handle_packet, AckBlock(block_id=3))
+    trio.run(connection.handle_packet, AckBlock(block_id=2 ** 48 - 1))
+    assert connection.acknowledged_blocks == bytearray(3)
+
+
+def test_ack_block_in_range_is_acknowledged():
+    connection = create_server_side_connection(number_of_blocks=2)
+    trio.run(connection.handle_packet, AckBlock(block_id=2))
+    assert connection.acknowledged_blocks == bytearray([0, 0, 1])
+
+
+def test_nack_block_out_of_range_is_ignored():
+    connection = create_server_side_connection(number_of_blocks=2)
+    trio.run(connection.handle_packet, NackBlock(block_id=3, received_packets=0))
+    assert len(connection.nack_heap) == 0
+    assert len(connection.pending_nacks) == 0